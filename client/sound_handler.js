@@ -65,6 +65,9 @@ class SoundHandler {
             try {
                 this.ws = new WebSocket(this.serverUrl);
 
+                // Model audio arrives as binary frames of raw 16-bit PCM
+                this.ws.binaryType = 'arraybuffer';
+
                 const connectionTimeout = setTimeout(() => {
                     if (!this.isConnected) {
                         console.error('Connection timed out');
@@ -98,49 +101,55 @@ class SoundHandler {
 
                 this.ws.onmessage = async (event) => {
                     try {
+                        if (event.data instanceof ArrayBuffer) {
+                            // Handle receiving audio data from server
+                            this.onAudioReceived(event.data);
+                            await this.playSound(event.data);
+                            return;
+                        }
+
                         // Log raw message data to help debug
                         console.log('Raw message received:', event.data);
 
-                        const message = JSON.parse(event.data);
-
-                        if (message.type === 'ready') {
-                            this.isConnected = true;
-                            this.onReady();
-                            resolve();
-                        }
-                        else if (message.type === 'audio') {
-                            // Handle receiving audio data from server
-                            const audioData = message.data;
-                            this.onAudioReceived(audioData);
-                            await this.playSound(audioData);
-                        }
-                        else if (message.type === 'text') {
-                            // Handle receiving text from server
-                            this.onTextReceived(message.data);
-                        }
-                        else if (message.type === 'user_transcript') {
-                            // Handle receiving user transcript from server
-                            this.onUserTranscript(message.data);
-                        }
-                        else if (message.type === 'turn_complete') {
-                            // Model is done speaking
-                            this.isModelSpeaking = false;
-                            this.onTurnComplete();
-                        }
-                        else if (message.type === 'interrupted') {
-                            // Response was interrupted
-                            this.isModelSpeaking = false;
-                            this.onInterrupted(message.data);
-                        }
-                        else if (message.type === 'error') {
-                            // Handle server error
-                            this.onError(message.data);
-                        }
-                        else if (message.type === 'session_id') {
-                            // Handle session ID
-                            console.log('Session ID received:', message);
-                            this.sessionId = message.data;
-                            this.onSessionIdReceived(message.data);
+                        const parsed = JSON.parse(event.data);
+
+                        // The server coalesces messages from one model event into a JSON array
+                        const messages = Array.isArray(parsed) ? parsed : [parsed];
+
+                        for (const message of messages) {
+                            if (message.type === 'ready') {
+                                this.isConnected = true;
+                                this.onReady();
+                                resolve();
+                            }
+                            else if (message.type === 'text') {
+                                // Handle receiving text from server
+                                this.onTextReceived(message.data);
+                            }
+                            else if (message.type === 'user_transcript') {
+                                // Handle receiving user transcript from server
+                                this.onUserTranscript(message.data);
+                            }
+                            else if (message.type === 'turn_complete') {
+                                // Model is done speaking
+                                this.isModelSpeaking = false;
+                                this.onTurnComplete();
+                            }
+                            else if (message.type === 'interrupted') {
+                                // Response was interrupted
+                                this.isModelSpeaking = false;
+                                this.onInterrupted(message.data);
+                            }
+                            else if (message.type === 'error') {
+                                // Handle server error
+                                this.onError(message.data);
+                            }
+                            else if (message.type === 'session_id') {
+                                // Handle session ID
+                                console.log('Session ID received:', message);
+                                this.sessionId = message.data;
+                                this.onSessionIdReceived(message.data);
+                            }
                         }
                     } catch (error) {
                         console.error('Error handling message:', error);
@@ -273,12 +282,9 @@ class SoundHandler {
         }
     }
 
-    // Decode and play received audio
-    async playSound(base64Audio) {
+    // Queue and play received PCM audio
+    async playSound(audioData) {
         try {
-            // Decode the base64 audio data
-            const audioData = this._base64ToArrayBuffer(base64Audio);
-
             // Create an audio context if needed
             if (!this.audioContext || this.audioContext.state === 'closed') {
                 this.audioContext = new (window.AudioContext || window.webkitAudioContext)({
@@ -461,15 +467,4 @@ class SoundHandler {
         }
         return btoa(binary);
     }
-
-    // Utility: Convert Base64 to ArrayBuffer
-    _base64ToArrayBuffer(base64) {
-        const binaryString = atob(base64);
-        const len = binaryString.length;
-        const bytes = new Uint8Array(len);
-        for (let i = 0; i < len; i++) {
-            bytes[i] = binaryString.charCodeAt(i);
-        }
-        return bytes.buffer;
-    }
 }
@@ -1,8 +1,9 @@
 import asyncio
-import json
+import collections
 import base64
 import logging
 import os
+import msgspec
 import websockets
 import traceback
 from websockets.exceptions import ConnectionClosed
@@ -29,6 +30,15 @@ VOICE_NAME = os.environ.get("VOICE_NAME", "Puck")
 RECEIVE_SAMPLE_RATE = 24000  # Rate of audio received from Gemini
 SEND_SAMPLE_RATE = 16000  # Rate of audio sent to Gemini
 
+# Per-client buffering limits before back-pressure reaches the WebSocket
+AUDIO_QUEUE_MAXSIZE = 32  # Audio chunks from the client
+VIDEO_QUEUE_MAXSIZE = 4  # Video frames from the client
+LIVE_REQUEST_BACKLOG_LIMIT = 32  # Frames sent to ADK but not yet consumed
+LIVE_REQUEST_MAX_STALL = 5.0  # Seconds to pause the client before dropping frames
+
+# Prebuilt message sent to every client once its connection is accepted
+_READY_MSG = msgspec.json.encode({"type": "ready"})
+
 # System instruction used by both implementations
 SYSTEM_INSTRUCTION = """
 You are NaviGo AI, a friendly and helpful travel assistant.
@@ -44,6 +54,56 @@ If you don't know the answer to a question, politely inform the user that you do
 If the user asks for information that is not related to travel, politely inform them that you cannot assist with that.
 """
 
+
+class FrameQueue:
+    """
+    Bounded single-producer, single-consumer FIFO for media frames. Cheaper
+    than asyncio.Queue when exactly one task puts and one task gets: a deque
+    and one waiter future per side, with no locks or task_done bookkeeping.
+    A full queue makes put() wait, pushing back on the producer.
+    """
+
+    __slots__ = ("_items", "_maxsize", "_getter", "_putter")
+
+    def __init__(self, maxsize=0):
+        self._items = collections.deque()
+        self._maxsize = maxsize
+        self._getter = None
+        self._putter = None
+
+    def full(self):
+        """Return True if the queue holds maxsize items"""
+        return 0 < self._maxsize <= len(self._items)
+
+    async def put(self, item):
+        """Append an item, waiting while the queue is full"""
+        while self.full():
+            self._putter = asyncio.get_running_loop().create_future()
+            try:
+                await self._putter
+            finally:
+                self._putter = None
+        self._items.append(item)
+        self._wake(self._getter)
+
+    async def get(self):
+        """Remove and return the oldest item, waiting until one is available"""
+        while not self._items:
+            self._getter = asyncio.get_running_loop().create_future()
+            try:
+                await self._getter
+            finally:
+                self._getter = None
+        item = self._items.popleft()
+        self._wake(self._putter)
+        return item
+
+    @staticmethod
+    def _wake(waiter):
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
 # Base WebSocket server class that handles common functionality
 
 
@@ -55,7 +115,11 @@ class BaseStreamServer:
 
     async def start_server(self):
         stream_logger.info(f"Starting stream server on {self.host}:{self.port}")
-        async with websockets.serve(self.manage_connection, self.host, self.port):
+        # Audio and video payloads are high-entropy, so permessage-deflate
+        # costs CPU without saving meaningful bandwidth
+        async with websockets.serve(
+            self.manage_connection, self.host, self.port, compression=None
+        ):
             await asyncio.Future()  # Run forever
 
     async def manage_connection(self, websocket):
@@ -64,7 +128,7 @@ class BaseStreamServer:
         stream_logger.info(f"New connection established: {connection_id}")
 
         # Send ready message to client
-        await websocket.send(json.dumps({"type": "ready"}))
+        await websocket.send(_READY_MSG, text=True)
 
         try:
             # Start processing the stream for this client
@@ -1,18 +1,29 @@
 from core_utils import (
     BaseStreamServer,
+    FrameQueue,
     stream_logger,
     MODEL,
     VOICE_NAME,
     SEND_SAMPLE_RATE,
+    AUDIO_QUEUE_MAXSIZE,
+    VIDEO_QUEUE_MAXSIZE,
+    LIVE_REQUEST_BACKLOG_LIMIT,
+    LIVE_REQUEST_MAX_STALL,
     SYSTEM_INSTRUCTION
 )
 import asyncio
-import json
 import base64
 import logging
 import os
 import traceback
 
+import msgspec
+
+try:
+    import uvloop
+except ImportError:  # uvloop does not support Windows
+    uvloop = None
+
 # Import Google ADK components
 from google.adk.agents import Agent, LiveRequestQueue
 from google.adk.runners import Runner
@@ -25,11 +36,83 @@ from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParamet
 
 load_dotenv()
 
+# Prebuilt JSON wrappers for outbound messages; variable payloads go through
+# msgspec.json.encode so quotes and control characters are still escaped.
+_TEXT_PREFIX = b'{"type":"text","data":'
+_USER_TRANSCRIPT_PREFIX = b'{"type":"user_transcript","data":'
+_SESSION_ID_PREFIX = b'{"type":"session_id","data":'
+_TURN_COMPLETE_PREFIX = b'{"type":"turn_complete","session_id":'
+_DATA_SUFFIX = b'}'
+_INTERRUPTED_MSG = msgspec.json.encode({
+    "type": "interrupted",
+    "data": "Response interrupted by user input"
+})
+
+
+# Messages sent by the client, discriminated by their "type" field
+class AudioIn(msgspec.Struct, tag="audio"):
+    data: str = ""
+
+
+class VideoIn(msgspec.Struct, tag="video"):
+    data: str = ""
+    mode: str | None = "webcam"
+
+
+class EndIn(msgspec.Struct, tag="end"):
+    pass
+
+
+class TextIn(msgspec.Struct, tag="text"):
+    data: str | None = None
+
+
+_CLIENT_MESSAGE_DECODER = msgspec.json.Decoder(AudioIn | VideoIn | EndIn | TextIn)
+
 # Import common components
 
 # Function tool for order status
 
 
+class BoundedLiveRequestQueue(LiveRequestQueue):
+    """
+    LiveRequestQueue that counts realtime blobs ADK has not consumed yet.
+    ADK's own queue is unbounded, so senders use wait_drained() to hold back
+    while the backlog is at the limit instead of letting it grow.
+    """
+
+    def __init__(self, limit):
+        super().__init__()
+        self._limit = limit
+        self._pending = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def backlogged(self):
+        """Return True from reaching the limit until the backlog halves"""
+        return not self._drained.is_set()
+
+    async def wait_drained(self):
+        """Wait until ADK has consumed the backlog down to half the limit"""
+        await self._drained.wait()
+
+    def send_realtime(self, blob):
+        self._pending += 1
+        if self._pending >= self._limit:
+            self._drained.clear()
+        super().send_realtime(blob)
+
+    async def get(self):
+        request = await super().get()
+        if getattr(request, "blob", None) is not None:
+            self._pending -= 1
+            # Resume at half the limit so a backlog hovering at the limit
+            # does not toggle the pause on every frame
+            if self._pending <= self._limit // 2:
+                self._drained.set()
+        return request
+
+
 class StreamingService(BaseStreamServer):
     """Real-time streaming service for audio and video data."""
 
@@ -49,32 +132,17 @@ class StreamingService(BaseStreamServer):
         # Create session service
         self.session_service = InMemorySessionService()
 
-    async def handle_stream(self, websocket, client_id):
-        """Process real-time data streams from the client."""
-        # Store client reference
-        self.active_connections[client_id] = websocket
-
-        # Create a new session for the client
-        user_id = f"user_{client_id}"
-        session_id = f"session_{client_id}"
-        await self.session_service.create_session(
-            app_name="streaming_assistant",
-            user_id=user_id,
-            session_id=session_id,
-        )
-
-        # Create runner
-        runner = Runner(
+        # Agent and session service are fixed for the server's lifetime, so one
+        # runner serves every client session
+        self.runner = Runner(
             app_name="streaming_assistant",
             agent=self.agent,
             session_service=self.session_service,
         )
 
-        # Create live request queue
-        live_request_queue = LiveRequestQueue()
-
-        # Create run config with audio settings
-        run_config = RunConfig(
+        # Create run config with audio settings; it only depends on module
+        # settings, so every session shares it
+        self.run_config = RunConfig(
             streaming_mode=StreamingMode.BIDI,
             speech_config=types.SpeechConfig(
                 voice_config=types.VoiceConfig(
@@ -88,34 +156,106 @@ class StreamingService(BaseStreamServer):
             input_audio_transcription=types.AudioTranscriptionConfig(),
         )
 
+    async def handle_stream(self, websocket, client_id):
+        """Process real-time data streams from the client."""
+        # Store client reference
+        self.active_connections[client_id] = websocket
+
+        # Create a new session for the client
+        user_id = f"user_{client_id}"
+        session_id = f"session_{client_id}"
+        await self.session_service.create_session(
+            app_name="streaming_assistant",
+            user_id=user_id,
+            session_id=session_id,
+        )
+
+        runner = self.runner
+
+        # Create live request queue
+        live_request_queue = BoundedLiveRequestQueue(LIVE_REQUEST_BACKLOG_LIMIT)
+
+        run_config = self.run_config
+
         # Queues for audio and video data from the client
-        audio_queue = asyncio.Queue()
-        video_queue = asyncio.Queue()
+        audio_queue = FrameQueue(maxsize=AUDIO_QUEUE_MAXSIZE)
+        video_queue = FrameQueue(maxsize=VIDEO_QUEUE_MAXSIZE)
+
+        # While Gemini is behind, the senders pause and the bounded queues
+        # above fill, so the client receive loop stops reading. The pause is
+        # capped: a paused receive loop also stops reading keepalive pongs, so
+        # past LIVE_REQUEST_MAX_STALL frames are dropped instead to keep the
+        # connection alive.
+        stall_deadline = None
+        dropping_frames = False
+
+        async def wait_for_live_backlog():
+            """Wait for the ADK backlog to drain; False means drop the frame"""
+            nonlocal stall_deadline, dropping_frames
+            loop = asyncio.get_running_loop()
+            if stall_deadline is None:
+                stall_deadline = loop.time() + LIVE_REQUEST_MAX_STALL
+                stream_logger.warning(
+                    "Gemini is not keeping up; pausing client media until it catches up.")
+            remaining = stall_deadline - loop.time()
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(
+                        live_request_queue.wait_drained(), remaining)
+                except TimeoutError:
+                    pass
+            if live_request_queue.backlogged():
+                if not dropping_frames:
+                    dropping_frames = True
+                    stream_logger.warning(
+                        "Gemini is still behind; dropping client media frames.")
+                return False
+            if stall_deadline is not None:
+                stall_deadline = None
+                dropping_frames = False
+                stream_logger.info("Gemini caught up; resuming client media.")
+            return True
 
         async with asyncio.TaskGroup() as tg:
             # Task to process incoming WebSocket messages
             async def receive_client_messages():
+                decode = _CLIENT_MESSAGE_DECODER.decode
+                loop = asyncio.get_running_loop()
+                warned_unsupported = False
                 async for message in websocket:
                     try:
-                        data = json.loads(message)
-                        if data.get("type") == "audio":
-                            audio_bytes = base64.b64decode(
-                                data.get("data", ""))
-                            await audio_queue.put(audio_bytes)
-                        elif data.get("type") == "video":
-                            video_bytes = base64.b64decode(
-                                data.get("data", ""))
-                            video_mode = data.get("mode", "webcam")
-                            await video_queue.put({"data": video_bytes, "mode": video_mode})
-                        elif data.get("type") == "end":
-                            stream_logger.info(
-                                "Client has concluded data transmission for this turn.")
-                        elif data.get("type") == "text":
-                            stream_logger.info(
-                                f"Received text from client: {data.get('data')}")
-                    except json.JSONDecodeError:
+                        # msgspec already resolved the message type; cases are
+                        # ordered by frequency so audio chunks match first
+                        match decode(message):
+                            case AudioIn(data=b64_audio):
+                                audio_bytes = base64.b64decode(b64_audio)
+                                await audio_queue.put(audio_bytes)
+                            case VideoIn(data=b64_video, mode=video_mode):
+                                # Video frames are large; decode them off the event loop
+                                video_bytes = await loop.run_in_executor(
+                                    None, base64.b64decode, b64_video)
+                                await video_queue.put({"data": video_bytes, "mode": video_mode})
+                            case EndIn():
+                                stream_logger.info(
+                                    "Client has concluded data transmission for this turn.")
+                            case TextIn(data=text):
+                                stream_logger.info(
+                                    f"Received text from client: {text}")
+                    except msgspec.ValidationError as e:
+                        # Well-formed JSON with an unsupported type or fields.
+                        # Warn once per connection so a protocol mismatch is
+                        # visible without letting a newer client flood the log
+                        if not warned_unsupported:
+                            warned_unsupported = True
+                            stream_logger.warning(
+                                f"Ignoring unsupported client message: {e} "
+                                "(further ones on this connection are logged at debug level)")
+                        else:
+                            stream_logger.debug(
+                                f"Ignoring unsupported client message: {e}")
+                    except msgspec.DecodeError as e:
                         stream_logger.error(
-                            "Could not decode incoming JSON message.")
+                            f"Could not decode incoming JSON message: {e}")
                     except Exception as e:
                         stream_logger.error(
                             f"Exception while processing client message: {e}")
@@ -123,15 +263,18 @@ class StreamingService(BaseStreamServer):
             async def send_audio_to_service():
                 while True:
                     data = await audio_queue.get()
+                    if live_request_queue.backlogged() and not await wait_for_live_backlog():
+                        continue
                     live_request_queue.send_realtime(
                         types.Blob(
                             data=data, mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}")
                     )
-                    audio_queue.task_done()
 
             async def send_video_to_service():
                 while True:
                     video_data = await video_queue.get()
+                    if live_request_queue.backlogged() and not await wait_for_live_backlog():
+                        continue
                     video_bytes = video_data.get("data")
                     video_mode = video_data.get("mode", "webcam")
                     stream_logger.info(
@@ -139,7 +282,6 @@ class StreamingService(BaseStreamServer):
                     live_request_queue.send_realtime(
                         types.Blob(data=video_bytes, mime_type="image/jpeg")
                     )
-                    video_queue.task_done()
 
             async def receive_service_responses():
                 # Track user and model outputs between turn completion events
@@ -150,6 +292,20 @@ class StreamingService(BaseStreamServer):
                 # Flag to track if we've seen an interruption in the current turn
                 interrupted = False
 
+                # Messages produced by one event are sent in order once the event
+                # is handled; consecutive messages of the same kind share a frame
+                outbox = []
+
+                def enqueue(message, text=True):
+                    if outbox and outbox[-1][0] is text:
+                        outbox[-1][1].append(message)
+                    else:
+                        outbox.append((text, [message]))
+
+                # Bind hot-loop callables to locals to skip repeated attribute lookups
+                send = websocket.send
+                encode = msgspec.json.encode
+
                 # Process responses from the agent
                 async for event in runner.run_live(
                     user_id=user_id,
@@ -157,61 +313,58 @@ class StreamingService(BaseStreamServer):
                     live_request_queue=live_request_queue,
                     run_config=run_config,
                 ):
-                    # Check for turn completion or interruption using string matching
-                    # This is a fallback approach until a proper API exists
-                    event_str = str(event)
+                    # Streaming chunks arrive with partial=True; read the flag
+                    # from the event instead of scanning str(event) for it
+                    partial = event.partial
 
                     # If there's a session resumption update, store the session ID
-                    if hasattr(event, 'session_resumption_update') and event.session_resumption_update:
-                        update = event.session_resumption_update
-                        if update.resumable and update.new_handle:
-                            current_session_id = update.new_handle
-                            stream_logger.info(
-                                f"Established new session with handle: {current_session_id}")
-                            # Send session ID to client
-                            session_id_msg = json.dumps({
-                                "type": "session_id",
-                                "data": current_session_id
-                            })
-                            await websocket.send(session_id_msg)
+                    update = getattr(event, "session_resumption_update", None)
+                    if update and update.resumable and update.new_handle:
+                        current_session_id = update.new_handle
+                        stream_logger.info(
+                            f"Established new session with handle: {current_session_id}")
+                        # Send session ID to client
+                        enqueue(_SESSION_ID_PREFIX + encode(current_session_id) + _DATA_SUFFIX)
 
                     # Handle content
-                    if event.content and event.content.parts:
-                        for part in event.content.parts:
-                            # Process audio content
-                            if hasattr(part, "inline_data") and part.inline_data:
-                                b64_audio = base64.b64encode(
-                                    part.inline_data.data).decode("utf-8")
-                                await websocket.send(json.dumps({"type": "audio", "data": b64_audio}))
+                    content = event.content
+                    if content and content.parts:
+                        role = getattr(content, "role", None)
+                        for part in content.parts:
+                            inline_data = getattr(part, "inline_data", None)
+                            text = getattr(part, "text", None)
+
+                            # Process audio content; raw PCM goes out as a binary frame
+                            if inline_data:
+                                enqueue(inline_data.data, text=False)
 
                             # Process text content
-                            if hasattr(part, "text") and part.text:
+                            if text:
                                 # Check if this is user or model text based on content role
-                                if hasattr(event.content, "role") and event.content.role == "user":
+                                if role == "user":
                                     # User text should be sent to the client
-                                    if "partial=True" in event_str:
-                                        await websocket.send(json.dumps({"type": "user_transcript", "data": part.text}))
-                                    input_texts.append(part.text)
+                                    if partial:
+                                        enqueue(_USER_TRANSCRIPT_PREFIX + encode(text) + _DATA_SUFFIX)
+                                    # Skip repeats of the previous chunk to prevent duplication
+                                    if not input_texts or input_texts[-1] != text:
+                                        input_texts.append(text)
                                 else:
                                     # From the logs, we can see the duplicated text issue happens because
                                     # we get streaming chunks with "partial=True" followed by a final consolidated
                                     # response with "partial=None" containing the complete text
 
-                                    # Check in the event string for the partial flag
-                                    # Only process messages with "partial=True"
-                                    if "partial=True" in event_str:
-                                        await websocket.send(json.dumps({"type": "text", "data": part.text}))
-                                        output_texts.append(part.text)
+                                    # Only process messages with partial=True
+                                    if partial:
+                                        enqueue(_TEXT_PREFIX + encode(text) + _DATA_SUFFIX)
+                                        if not output_texts or output_texts[-1] != text:
+                                            output_texts.append(text)
                                     # Skip messages with "partial=None" to avoid duplication
 
                     # Check for interruption
                     if event.interrupted and not interrupted:
                         stream_logger.warning(
                             "User has interrupted the stream.")
-                        await websocket.send(json.dumps({
-                            "type": "interrupted",
-                            "data": "Response interrupted by user input"
-                        }))
+                        enqueue(_INTERRUPTED_MSG)
                         interrupted = True
 
                     # Check for turn completion
@@ -220,29 +373,36 @@ class StreamingService(BaseStreamServer):
                         if not interrupted:
                             stream_logger.info(
                                 "The model has completed its turn.")
-                            await websocket.send(json.dumps({
-                                "type": "turn_complete",
-                                "session_id": current_session_id
-                            }))
+                            enqueue(_TURN_COMPLETE_PREFIX + encode(current_session_id) + _DATA_SUFFIX)
 
                         # Log collected transcriptions for debugging
                         if input_texts:
-                            # Get unique texts to prevent duplication
-                            unique_texts = list(dict.fromkeys(input_texts))
                             stream_logger.info(
-                                f"Transcribed user speech: {' '.join(unique_texts)}")
+                                f"Transcribed user speech: {' '.join(input_texts)}")
 
                         if output_texts:
-                            # Get unique texts to prevent duplication
-                            unique_texts = list(dict.fromkeys(output_texts))
                             stream_logger.info(
-                                f"Generated model response: {' '.join(unique_texts)}")
+                                f"Generated model response: {' '.join(output_texts)}")
 
                         # Reset for next turn
                         input_texts = []
                         output_texts = []
                         interrupted = False
 
+                    # Flush this event's messages in order, one frame per run of
+                    # same-kind messages: a WebSocket frame is either text or
+                    # binary, so an event mixing audio and JSON takes more than
+                    # one. Several JSON messages become a JSON array; consecutive
+                    # PCM chunks are joined into one binary frame.
+                    for text, messages in outbox:
+                        if not text:
+                            await send(b"".join(messages), text=False)
+                        elif len(messages) == 1:
+                            await send(messages[0], text=True)
+                        else:
+                            await send(b"[" + b",".join(messages) + b"]", text=True)
+                    outbox.clear()
+
             # Start all tasks
             tg.create_task(receive_client_messages(),
                            name="ClientMessageReceiver")
@@ -260,7 +420,11 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        # Prefer uvloop's faster event loop when it is installed
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         stream_logger.info("Server is shutting down.")
     except Exception as e:
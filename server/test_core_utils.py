@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from core_utils import FrameQueue
+
+
+class FrameQueueTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the single-producer, single-consumer FrameQueue"""
+
+    async def test_get_waits_until_put(self):
+        queue = FrameQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+
+        await queue.put(b"frame")
+        self.assertEqual(await asyncio.wait_for(getter, 1), b"frame")
+
+    async def test_put_blocks_while_full(self):
+        queue = FrameQueue(maxsize=2)
+        await queue.put(1)
+        await queue.put(2)
+        self.assertTrue(queue.full())
+
+        putter = asyncio.create_task(queue.put(3))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+
+        self.assertEqual(await queue.get(), 1)
+        await asyncio.wait_for(putter, 1)
+        self.assertEqual(await queue.get(), 2)
+        self.assertEqual(await queue.get(), 3)
+
+    async def test_fifo_order_with_slow_consumer(self):
+        queue = FrameQueue(maxsize=2)
+
+        async def produce():
+            for i in range(100):
+                await queue.put(i)
+
+        producer = asyncio.create_task(produce())
+        received = []
+        for _ in range(100):
+            received.append(await queue.get())
+            await asyncio.sleep(0)
+        await asyncio.wait_for(producer, 1)
+        self.assertEqual(received, list(range(100)))
+
+    async def test_cancelled_get_does_not_lose_items(self):
+        queue = FrameQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+
+        await queue.put(b"frame")
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), b"frame")
+
+    async def test_cancelled_put_does_not_enqueue(self):
+        queue = FrameQueue(maxsize=1)
+        await queue.put(1)
+        putter = asyncio.create_task(queue.put(2))
+        await asyncio.sleep(0)
+        putter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await putter
+
+        self.assertEqual(await queue.get(), 1)
+        await asyncio.wait_for(queue.put(3), 1)
+        self.assertEqual(await queue.get(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()